@@ -0,0 +1,416 @@
+"""
+Shared helpers for the market analysis scripts.
+Provides the environment configuration, the chart backend helpers, the
+NYSE trading calendar used to compute trading days, the shared HTTP
+session, an on-disk cache for API responses, the per-day fetch and
+aggregation used by the performance scripts and JSON encoding helpers.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMartinLutherKingJr,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    sunday_to_monday,
+)
+
+# orjson is optional; fall back to the stdlib json module when missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# API responses are cached here for CACHE_TTL seconds
+CACHE_DIR = Path.home() / '.cache' / 'ki-wealth'
+CACHE_TTL = 3600
+
+
+# Environment variable behind each Config field
+CONFIG_ENV_VARS = {
+    'api_key': 'FMP_API_KEY',
+    'industry_performance_url': 'INDUSTRY_PERFORMANCE_URL',
+    'available_industries_url': 'AVAILABLE_INDUSTRIES',
+    'sector_performance_url': 'SECTOR_PERFORMANCE_URL',
+}
+
+
+@dataclass(frozen=True)
+class Config:
+    """
+    FMP API key and endpoint URLs taken from the environment.
+    """
+    api_key: Optional[str]
+    industry_performance_url: Optional[str]
+    available_industries_url: Optional[str]
+    sector_performance_url: Optional[str]
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """
+    Reads the configuration from environment variables on first use, so
+    importing a script never depends on the environment. The scripts call
+    load_dotenv() beforehand to pick up a .env file.
+
+    Returns:
+        Config: Settings for this process
+    """
+    return Config(**{field: os.getenv(var) for field, var in CONFIG_ENV_VARS.items()})
+
+
+def require_config(*fields: str) -> Config:
+    """
+    Returns the configuration, failing fast before any network I/O when a
+    setting the caller needs is missing.
+
+    Args:
+        *fields (str): Config fields the caller needs (e.g. 'api_key')
+
+    Returns:
+        Config: Settings for this process
+
+    Raises:
+        ValueError: Naming every missing environment variable
+    """
+    config = get_config()
+    missing = [CONFIG_ENV_VARS[field] for field in fields if not getattr(config, field)]
+    if missing:
+        raise ValueError(f"Missing environment variables: {', '.join(missing)}")
+    return config
+
+
+class LoggingRetry(Retry):
+    """
+    Retry policy that reports each retry attempt before backing off.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        reason = response.status if response is not None else error
+        # Drop the query string so the API key is never printed
+        print(f"↻ Retrying {(url or '').split('?')[0]} ({reason}), {new_retry.total} attempts left")
+        return new_retry
+
+
+# Shared session: pooled keep-alive connections, compressed responses (requests'
+# default Accept-Encoding) and retries with exponential backoff on transient FMP failures (honours Retry-After)
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=8,
+    max_retries=LoggingRetry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods={'GET'}
+    )
+))
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """
+    Regular NYSE market holidays.
+    Unscheduled closures (e.g. national days of mourning) are not included.
+    """
+    rules = [
+        # NYSE does not close on Friday when January 1 falls on a Saturday
+        Holiday('New Years Day', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas Day', month=12, day=25, observance=nearest_workday),
+    ]
+
+
+def interactive() -> bool:
+    """
+    Tells whether the script runs in a terminal, where charts can be shown.
+    Batch runs (cron, CI, pipes) only need the saved PNG.
+
+    Returns:
+        bool: True when stdout is a TTY
+    """
+    return sys.stdout.isatty()
+
+
+def use_batch_backend() -> None:
+    """
+    Switches matplotlib to the non-GUI Agg backend for batch runs.
+    Call before importing matplotlib.pyplot.
+    """
+    if not interactive():
+        # Imported here so scripts without charts never load matplotlib
+        import matplotlib
+        matplotlib.use('Agg')
+
+
+@lru_cache(maxsize=1)
+def nyse_busdaycalendar() -> np.busdaycalendar:
+    """
+    Returns a numpy business-day calendar with NYSE holidays, for use with
+    np.busday_offset and friends. Built once per process since expanding the
+    holiday rules is the costly part; all trading-day arithmetic goes through it.
+
+    Returns:
+        np.busdaycalendar: Calendar of NYSE trading days
+    """
+    holidays = NYSEHolidayCalendar().holidays()
+    return np.busdaycalendar(holidays=holidays.to_numpy(dtype='datetime64[D]'))
+
+
+def json_dumps(data, indent: int = 2) -> bytes:
+    """
+    Serializes data to UTF-8 encoded JSON.
+    Uses orjson when it is installed and the indent is 2 (the only indent it supports).
+
+    Args:
+        data: JSON-serializable data
+        indent (int): Number of spaces for indentation
+
+    Returns:
+        bytes: Encoded JSON document
+    """
+    if orjson is not None and indent == 2:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+
+    return json.dumps(data, indent=indent, ensure_ascii=False).encode('utf-8')
+
+
+def get_trading_days(num_days=5):
+    """
+    Generate a list of the past N trading days (excluding weekends and NYSE holidays).
+    Returns dates in YYYY-MM-DD format, most recent first.
+    """
+    # Roll today back to the latest trading day, then step back one trading day at a time
+    trading_days = np.busday_offset(
+        np.datetime64(datetime.now().date(), 'D'),
+        -np.arange(num_days),
+        roll='backward',
+        busdaycal=nyse_busdaycalendar()
+    )
+    
+    return [str(day) for day in trading_days]
+
+
+def get_next_trading_days(num_days=5):
+    """
+    Generate a list of the next N trading days (excluding weekends and NYSE holidays).
+    Returns dates in YYYY-MM-DD format.
+    
+    Args:
+        num_days (int): Number of trading days to generate (default: 5)
+    
+    Returns:
+        list: List of date strings in YYYY-MM-DD format
+    """
+    # Roll today back to the latest trading day, then step forward so the
+    # first date is the next session after today
+    trading_days = np.busday_offset(
+        np.datetime64(datetime.now().date(), 'D'),
+        np.arange(1, num_days + 1),
+        roll='backward',
+        busdaycal=nyse_busdaycalendar()
+    )
+    
+    return [str(day) for day in trading_days]
+
+
+def fetch_daily(url_base: str, api_key: str, dates: list) -> pd.DataFrame:
+    """
+    Fetches a per-date FMP endpoint for every date concurrently on the shared session.
+    Transient failures are retried by the session; days that still fail or
+    return no data are reported and skipped, with a warning when any are missing.
+    
+    Args:
+        url_base (str): Endpoint URL without query parameters
+        api_key (str): FMP API key
+        dates (list): Dates in YYYY-MM-DD format
+    
+    Returns:
+        pd.DataFrame: All records with a 'fetch_date' column, or None if nothing was fetched
+    """
+    def fetch_day(date):
+        response = SESSION.get(f"{url_base}?date={date}&apikey={api_key}", timeout=15)
+        response.raise_for_status()
+        return json_loads(response.content)
+    
+    with ThreadPoolExecutor(max_workers=len(dates)) as executor:
+        futures = {date: executor.submit(fetch_day, date) for date in dates}
+    
+    # All fetches have finished here; report each date's result in order
+    frames = []
+    for date, future in futures.items():
+        print(f"{date}: ", end="")
+        try:
+            data = future.result()
+        except requests.exceptions.RequestException as e:
+            print(f"✗ Error: {e}")
+            continue
+        except ValueError as e:
+            print(f"✗ JSON Error: {e}")
+            continue
+        
+        if not data:
+            print("⚠ No data")
+        elif not isinstance(data, list):
+            # FMP reports errors such as an invalid key as a JSON object, not a list of records
+            print(f"✗ Unexpected payload: {data}")
+        else:
+            # Add date to the day's records in one column assignment
+            frames.append(pd.DataFrame(data).assign(fetch_date=date))
+            print(f"✓ ({len(data)} records)")
+    
+    if not frames:
+        return None
+    
+    # Failed days have already been retried on the session; a missing day
+    # would otherwise shrink the cumulative totals without notice
+    if len(frames) < len(dates):
+        print(f"⚠ Only {len(frames)} of {len(dates)} days fetched; cumulative totals cover the fetched days only")
+    
+    return pd.concat(frames, ignore_index=True)
+
+
+def cumulative_by(df: pd.DataFrame, group_col: str, value_col: str) -> pd.Series:
+    """
+    Sums a performance column per group, sorted from maximum to minimum.
+    
+    Args:
+        df (pd.DataFrame): Daily performance records
+        group_col (str): Column to group by (e.g. 'industry', 'sector')
+        value_col (str): Column to sum (e.g. 'averageChange')
+    
+    Returns:
+        pd.Series: Cumulative performance indexed by group
+    """
+    # Integer group codes: reuse a categorical column's codes, otherwise factorize once
+    groups = df[group_col]
+    if isinstance(groups.dtype, pd.CategoricalDtype):
+        codes, labels = groups.cat.codes.to_numpy(), groups.cat.categories
+    else:
+        codes, labels = pd.factorize(groups)
+    
+    # Rows with a missing group (code -1) are skipped and missing values count
+    # as 0, matching groupby().sum()
+    valid = codes >= 0
+    codes = codes[valid]
+    values = np.nan_to_num(df[value_col].to_numpy(dtype=np.float64)[valid])
+    
+    # Per-group sums in a single C pass; keep only groups that have rows
+    sums = np.bincount(codes, weights=values, minlength=len(labels))
+    observed = np.bincount(codes, minlength=len(labels)) > 0
+    
+    cumulative = pd.Series(sums[observed], index=pd.Index(labels[observed], name=group_col), name=value_col)
+    return cumulative.sort_values(ascending=False)
+
+
+def get_cached(url: str, session: requests.Session = SESSION, use_cache: bool = True, ttl: int = CACHE_TTL, validate=None, **kwargs) -> bytes:
+    """
+    Fetches the response body for a URL, reusing a gzipped copy on disk
+    when one younger than the TTL exists.
+    
+    Args:
+        url (str): Complete request URL (query parameters are part of the cache key)
+        session (requests.Session): Session used for the request
+        use_cache (bool): Read and write the on-disk cache
+        ttl (int): Maximum age of a cached response in seconds
+        validate (callable): Called with a fresh response body; the body is
+            only written to the cache when it returns True (e.g. is_record_list)
+        **kwargs: Extra arguments passed to session.get (headers, timeout, ...)
+    
+    Returns:
+        bytes: Response body
+    
+    Raises:
+        requests.exceptions.RequestException: If the request fails
+    """
+    path = CACHE_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json.gz"
+    
+    if use_cache:
+        try:
+            if time.time() - path.stat().st_mtime < ttl:
+                print(f"↺ Using cached response ({path.name})")
+                return gzip.decompress(path.read_bytes())
+        except (OSError, EOFError):
+            # Missing or unreadable cache entry, fetch it again
+            pass
+    
+    response = session.get(url, **kwargs)
+    response.raise_for_status()
+    content = response.content
+    
+    # A 2xx body can still be an error payload; never keep one around for the TTL
+    if use_cache and (validate is None or validate(content)):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(gzip.compress(content))
+        except OSError as e:
+            print(f"⚠ Could not write cache file {path}: {e}")
+    
+    return content
+
+
+def json_loads(content):
+    """
+    Parses a JSON document (bytes or str).
+    Uses orjson when it is installed, falling back to the stdlib json module.
+    Both raise a json.JSONDecodeError (a ValueError) on invalid input.
+
+    Args:
+        content (bytes | str): Encoded JSON document
+
+    Returns:
+        Parsed data
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+
+    return json.loads(content)
+
+
+def is_record_list(content) -> bool:
+    """
+    Tells whether an FMP response body is a non-empty list of records.
+    FMP reports failures such as an invalid key or an exceeded limit as a
+    JSON object with a 2xx status, so the status alone is not enough.
+
+    Args:
+        content (bytes | str): Encoded JSON document
+
+    Returns:
+        bool: True for a non-empty JSON list
+    """
+    try:
+        data = json_loads(content)
+    except ValueError:
+        return False
+
+    return isinstance(data, list) and len(data) > 0
@@ -0,0 +1,59 @@
+"""Renders the 5-day industry and sector performance charts as one two-panel dashboard image."""
+import sys
+from common import interactive, use_batch_backend
+use_batch_backend()
+import matplotlib.pyplot as plt
+from performance_by_industry import draw_industry_bars, get_industry_performance
+from sector_performance import CHART_RC, draw_sector_bars, get_sector_performance
+
+
+def render_dashboard(industry_df, sector_df, output_path='dashboard_5day.png'):
+    """
+    Draws the industry and sector charts as two panels of a single figure, so
+    the layout and rasterization passes run once for both charts.
+
+    Args:
+        industry_df (pd.DataFrame): DataFrame containing industry and cumulative_performance columns
+        sector_df (pd.DataFrame): DataFrame containing sector and cumulative_performance columns
+        output_path (str): Path of the saved PNG
+    """
+    if industry_df is None or industry_df.empty or sector_df is None or sector_df.empty:
+        print("No data available to create dashboard.")
+        return
+
+    # Both panels share the brand font; the previous rcParams are restored on exit
+    with plt.rc_context(CHART_RC):
+        fig, (industry_ax, sector_ax) = plt.subplots(
+            2, 1,
+            figsize=(18, 26),
+            gridspec_kw={'height_ratios': [14, 12]}
+        )
+        draw_industry_bars(industry_ax, industry_df)
+        draw_sector_bars(sector_ax, sector_df)
+
+        # Add source attribution below both panels
+        fig.text(
+            0.5, 0.01,
+            'Source: prepared by Ki-Wealth | 5-Day Cumulative Performance',
+            ha='center',
+            fontsize=10,
+            color='black',
+            style='italic'
+        )
+
+        # One layout pass and one raster pass for the whole dashboard
+        fig.tight_layout(rect=[0.02, 0.02, 0.98, 0.99])
+        fig.savefig(output_path, dpi=150, bbox_inches='tight', pad_inches=0.3)
+        print(f"\n✓ Dashboard saved as '{output_path}'")
+        if interactive():
+            plt.show()
+
+    # Release the figure so repeated runs in one process do not accumulate them
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    # Pass --no-cache to force a fresh industries list
+    industry_df = get_industry_performance(use_cache='--no-cache' not in sys.argv)
+    sector_df = get_sector_performance(create_chart=False)
+    render_dashboard(industry_df, sector_df)
@@ -1,54 +1,37 @@
 
 """
 Fetches earnings calendar data for the next five trading days using the FMP API.
-Automatically calculates trading days excluding weekends.
+Automatically calculates trading days excluding weekends and NYSE holidays.
 """
 
 import os
+import sys
 import json
 import requests
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # Output is the PNG file; skip loading a GUI backend
 import matplotlib.pyplot as plt
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from common import get_cached, get_next_trading_days, is_record_list, json_dumps, json_loads
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Default symbol filter: tickers made of 1 to 4 letters
+DEFAULT_SYMBOL_PATTERN = r'^[a-zA-Z]{1,4}$'
 
-def get_next_trading_days(num_days=5):
-    """
-    Generate a list of the next N trading days (excluding weekends).
-    Returns dates in YYYY-MM-DD format.
-    
-    Args:
-        num_days (int): Number of trading days to generate (default: 5)
-    
-    Returns:
-        list: List of date strings in YYYY-MM-DD format
-    """
-    trading_days = []
-    current_date = datetime.now()
-    days_checked = 0
-    
-    while len(trading_days) < num_days and days_checked < num_days * 2:
-        current_date += timedelta(days=1)
-        # Check if it's a weekday (Monday=0, Sunday=6)
-        if current_date.weekday() < 5:  # Monday to Friday
-            trading_days.append(current_date.strftime('%Y-%m-%d'))
-        days_checked += 1
-    
-    return trading_days
 
-
-def fetch_earnings_by_date_range(from_date: str = None, to_date: str = None) -> dict:
+def fetch_earnings_by_date_range(from_date: str = None, to_date: str = None, use_cache: bool = True) -> dict:
     """
     Fetches earnings calendar data for a specific date range.
     If dates are not provided, automatically fetches data for the next 5 trading days.
+    Responses are reused from the on-disk cache for up to an hour.
     
     Args:
         from_date (str, optional): Start date in format YYYY-MM-DD
         to_date (str, optional): End date in format YYYY-MM-DD
+        use_cache (bool): Reuse a recently cached response for the same range
     
     Returns:
         dict: JSON response containing earnings data
@@ -82,17 +65,22 @@ def fetch_earnings_by_date_range(from_date: str = None, to_date: str = None) ->
     print(f"URL: {url.replace(api_key, 'API_KEY_HIDDEN')}\n")
     
     try:
-        # Make the API request
-        response = requests.get(url)
-        response.raise_for_status()
+        # Make the API request on the shared session (compressed transfer,
+        # retries on transient failures, bounded wait)
+        content = get_cached(url, use_cache=use_cache, validate=is_record_list, timeout=15)
         
         # Parse JSON response
-        data = response.json()
+        data = json_loads(content)
         
         if not data:
             print("⚠ No earnings data found for the specified date range")
             return {}
         
+        if not isinstance(data, list):
+            # FMP reports errors such as an invalid key as a JSON object, not a list of records
+            print(f"✗ Unexpected payload: {data}")
+            return {}
+        
         print(f"✓ Successfully fetched {len(data)} earnings records\n")
         return data
         
@@ -119,7 +107,7 @@ def display_json(data: dict, indent: int = 2) -> None:
     print("="*80)
     print("EARNINGS CALENDAR DATA (JSON FORMAT)")
     print("="*80)
-    print(json.dumps(data, indent=indent))
+    print(json_dumps(data, indent=indent).decode('utf-8'))
     print("="*80)
 
 
@@ -136,13 +124,34 @@ def save_to_json_file(data: dict, filename: str = "earnings_week_data.json") ->
         return
     
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        with open(filename, 'wb') as f:
+            f.write(json_dumps(data))
         print(f"\n✓ Data saved to {filename}")
     except Exception as e:
         print(f"✗ Error saving to file: {e}")
 
 
+def dict_to_dataframe(data: dict) -> pd.DataFrame:
+    """
+    Transforms earnings data already in memory into a DataFrame.
+    Converts 'date' column from string to datetime format.
+    
+    Args:
+        data (dict): Earnings data as returned by the API
+    
+    Returns:
+        pd.DataFrame: DataFrame with earnings data
+    """
+    # Convert to DataFrame
+    df = pd.DataFrame(data)
+    
+    # Transform 'date' column from string to datetime
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d')
+    
+    return df
+
+
 def read_json_to_dataframe(filename: str = "earnings_week_data.json") -> pd.DataFrame:
     """
     Reads JSON file and transforms it into a DataFrame.
@@ -163,12 +172,7 @@ def read_json_to_dataframe(filename: str = "earnings_week_data.json") -> pd.Data
             print("⚠ No data found in JSON file")
             return pd.DataFrame()
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Transform 'date' column from string to datetime
-        if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d')
+        df = dict_to_dataframe(data)
         
         print(f"✓ Successfully loaded {len(df)} records from {filename}")
         return df
@@ -184,7 +188,29 @@ def read_json_to_dataframe(filename: str = "earnings_week_data.json") -> pd.Data
         return pd.DataFrame()
 
 
-def filter_and_display_by_date(df: pd.DataFrame, filter_pattern: str = r'^[a-zA-Z]{1,4}$', max_symbols: int = 10) -> None:
+def match_symbols(symbols: pd.Series, filter_pattern: str = DEFAULT_SYMBOL_PATTERN) -> pd.Series:
+    """
+    Builds a boolean mask of symbols matching the regex pattern.
+    The default 1-4 letter pattern is evaluated with vectorized length,
+    isalpha and isascii checks rather than a per-cell regex match.
+    
+    Args:
+        symbols (pd.Series): Series of ticker symbols
+        filter_pattern (str): Regex pattern to filter symbols
+    
+    Returns:
+        pd.Series: Boolean mask aligned with symbols
+    """
+    if filter_pattern == DEFAULT_SYMBOL_PATTERN:
+        symbols = symbols.fillna('').astype(str)
+        # isalpha alone accepts any Unicode letter; isascii keeps it to [a-zA-Z]
+        # (mapped over the values, since Series.str.isascii needs pandas 3)
+        return symbols.str.len().between(1, 4) & symbols.str.isalpha() & symbols.map(str.isascii)
+    
+    return symbols.str.match(filter_pattern, na=False)
+
+
+def filter_and_display_by_date(df: pd.DataFrame, filter_pattern: str = DEFAULT_SYMBOL_PATTERN, max_symbols: int = 10) -> None:
     """
     Filters DataFrame by date and displays maximum symbols per date.
     Only displays symbols that match the specified regex pattern.
@@ -203,7 +229,7 @@ def filter_and_display_by_date(df: pd.DataFrame, filter_pattern: str = r'^[a-zA-
         return
     
     # Filter symbols that match the regex pattern
-    mask = df['symbol'].str.match(filter_pattern, na=False)
+    mask = match_symbols(df['symbol'], filter_pattern)
     filtered_df = df[mask].copy()
     
     if filtered_df.empty:
@@ -213,40 +239,36 @@ def filter_and_display_by_date(df: pd.DataFrame, filter_pattern: str = r'^[a-zA-
     # Sort by date
     filtered_df = filtered_df.sort_values('date')
     
-    # Get unique dates
-    unique_dates = filtered_df['date'].dt.date.unique()
+    # Group by calendar day in a single pass
+    date_groups = filtered_df.groupby(filtered_df['date'].dt.normalize(), sort=True)
+    
+    # Select relevant columns for display (same for every date)
+    optional_columns = ['epsEstimated', 'epsActual', 'revenueEstimated', 'revenueActual', 'time']
+    display_columns = ['symbol', 'date', *[col for col in optional_columns if col in filtered_df.columns]]
     
     print("\n" + "="*80)
     print(f"FILTERED EARNINGS DATA (Symbols matching pattern: {filter_pattern})")
     print("="*80)
     
     # Display data for each date
-    for date in unique_dates:
+    for date, date_group in date_groups:
         date_str = date.strftime('%Y-%m-%d')
-        date_data = filtered_df[filtered_df['date'].dt.date == date].head(max_symbols)
+        date_data = date_group.head(max_symbols)
         
         print(f"\n📅 Date: {date_str}")
         print("-" * 80)
         
-        # Select relevant columns for display
-        display_columns = ['symbol', 'date']
-        optional_columns = ['epsEstimated', 'epsActual', 'revenueEstimated', 'revenueActual', 'time']
-        
-        for col in optional_columns:
-            if col in date_data.columns:
-                display_columns.append(col)
-        
         # Format date for display
         display_data = date_data[display_columns].copy()
         display_data['date'] = display_data['date'].dt.strftime('%Y-%m-%d')
         
         # Display table
         print(display_data.to_string(index=False))
-        print(f"\nShowing {len(date_data)} of {len(filtered_df[filtered_df['date'].dt.date == date])} symbols for this date")
+        print(f"\nShowing {len(date_data)} of {len(date_group)} symbols for this date")
     
     print("\n" + "="*80)
     print(f"Total filtered records: {len(filtered_df)}")
-    print(f"Total unique dates: {len(unique_dates)}")
+    print(f"Total unique dates: {date_groups.ngroups}")
     print("="*80 + "\n")
 
 
@@ -270,44 +292,40 @@ def display_all_data_by_date(df: pd.DataFrame, max_symbols: int = 10) -> None:
     # Sort by date
     df_sorted = df.sort_values('date')
     
-    # Get unique dates
-    unique_dates = df_sorted['date'].dt.date.unique()
+    # Group by calendar day in a single pass
+    date_groups = df_sorted.groupby(df_sorted['date'].dt.normalize(), sort=True)
+    
+    # Select relevant columns for display (same for every date)
+    optional_columns = ['epsEstimated', 'epsActual', 'revenueEstimated', 'revenueActual', 'time']
+    display_columns = ['symbol', 'date', *[col for col in optional_columns if col in df_sorted.columns]]
     
     print("\n" + "="*80)
     print("ALL EARNINGS DATA BY DATE")
     print("="*80)
     
     # Display data for each date
-    for date in unique_dates:
+    for date, date_group in date_groups:
         date_str = date.strftime('%Y-%m-%d')
-        date_data = df_sorted[df_sorted['date'].dt.date == date].head(max_symbols)
+        date_data = date_group.head(max_symbols)
         
         print(f"\n📅 Date: {date_str}")
         print("-" * 80)
         
-        # Select relevant columns for display
-        display_columns = ['symbol', 'date']
-        optional_columns = ['epsEstimated', 'epsActual', 'revenueEstimated', 'revenueActual', 'time']
-        
-        for col in optional_columns:
-            if col in date_data.columns:
-                display_columns.append(col)
-        
         # Format date for display
         display_data = date_data[display_columns].copy()
         display_data['date'] = display_data['date'].dt.strftime('%Y-%m-%d')
         
         # Display table
         print(display_data.to_string(index=False))
-        print(f"\nShowing {len(date_data)} of {len(df_sorted[df_sorted['date'].dt.date == date])} symbols for this date")
+        print(f"\nShowing {len(date_data)} of {len(date_group)} symbols for this date")
     
     print("\n" + "="*80)
     print(f"Total records: {len(df_sorted)}")
-    print(f"Total unique dates: {len(unique_dates)}")
+    print(f"Total unique dates: {date_groups.ngroups}")
     print("="*80 + "\n")
 
 
-def create_earnings_table(df: pd.DataFrame, filter_pattern: str = r'^[a-zA-Z]{1,4}$') -> None:
+def create_earnings_table(df: pd.DataFrame, filter_pattern: str = DEFAULT_SYMBOL_PATTERN) -> None:
     """
     Creates a professionally formatted table showing earnings data for the week.
     Groups symbols by date with maximum 10 symbols per date.
@@ -326,7 +344,7 @@ def create_earnings_table(df: pd.DataFrame, filter_pattern: str = r'^[a-zA-Z]{1,
         return
     
     # Filter symbols that match the regex pattern
-    mask = df['symbol'].str.match(filter_pattern, na=False)
+    mask = match_symbols(df['symbol'], filter_pattern)
     filtered_df = df[mask].copy()
     
     if filtered_df.empty:
@@ -336,20 +354,19 @@ def create_earnings_table(df: pd.DataFrame, filter_pattern: str = r'^[a-zA-Z]{1,
     # Sort by date
     filtered_df = filtered_df.sort_values('date')
     
-    # Group by date and aggregate symbols (max 10 per date)
-    grouped_data = []
-    for date, group in filtered_df.groupby(filtered_df['date'].dt.date):
-        # Get up to 10 symbols for this date
-        symbols = group['symbol'].head(10).tolist()
-        symbols_str = ', '.join(symbols)
-        
-        # Format date with day name
-        date_obj = pd.to_datetime(date)
-        day_name = date_obj.strftime('%A')  # Full day name (Monday, Tuesday, etc.)
-        date_str = date_obj.strftime('%Y-%m-%d')
-        formatted_date = f"{date_str}\n({day_name}, {date_obj.strftime('%B %d')})"
-        
-        grouped_data.append([formatted_date, symbols_str])
+    # Group by date and aggregate symbols (max 10 per date) in a single pass
+    days = filtered_df['date'].dt.normalize()
+    symbols_by_day = filtered_df.groupby(days, sort=True)['symbol'].agg(lambda s: ', '.join(s.head(10)))
+    
+    # Format every date label (with full day name) in one vectorized pass
+    unique_days = pd.DatetimeIndex(symbols_by_day.index)
+    labels = (
+        unique_days.strftime('%Y-%m-%d') + '\n(' +
+        unique_days.strftime('%A') + ', ' +
+        unique_days.strftime('%B %d') + ')'
+    )
+    
+    grouped_data = [[label, symbols] for label, symbols in zip(labels, symbols_by_day)]
     
     # Create DataFrame for display
     display_data = pd.DataFrame(grouped_data, columns=['Date', 'Symbols'])
@@ -360,70 +377,74 @@ def create_earnings_table(df: pd.DataFrame, filter_pattern: str = r'^[a-zA-Z]{1,
     
     # Create figure and axis
     fig, ax = plt.subplots(figsize=(20, fig_height))
-    ax.axis('tight')
-    ax.axis('off')
-    
-    # Create table
-    table = ax.table(
-        cellText=display_data.values,
-        colLabels=display_data.columns,
-        cellLoc='left',
-        loc='center',
-        bbox=[0, 0, 1, 1]
-    )
-    
-    # Style table
-    table.auto_set_font_size(False)
-    table.scale(1, 2)
-    
-    # Style header row
-    for i in range(len(display_data.columns)):
-        cell = table[(0, i)]
-        cell.set_facecolor('#4304B7')
-        cell.set_text_props(weight='bold', color='white', fontsize=20, ha='center')
-        cell.set_height(0.08)
-    
-    # Style data rows
-    for i in range(1, len(display_data) + 1):
-        # Date column (left-aligned, centered vertically)
-        date_cell = table[(i, 0)]
-        date_cell.set_facecolor('#F0F0F0')
-        date_cell.set_text_props(color='black', fontsize=16, ha='left', va='center', weight='bold')
-        date_cell.set_edgecolor('#CCCCCC')
-        date_cell.set_height(0.15)
+    try:
+        ax.axis('tight')
+        ax.axis('off')
         
-        # Symbols column (left-aligned, wrapped text)
-        symbol_cell = table[(i, 1)]
-        symbol_cell.set_facecolor('white')
-        symbol_cell.set_text_props(color='black', fontsize=16, ha='left', va='center')
-        symbol_cell.set_edgecolor('#CCCCCC')
-        symbol_cell.set_height(0.15)
-    
-    # Set column widths (Date: 20%, Symbols: 80%)
-    table.auto_set_column_width([0, 1])
-    for i in range(len(display_data) + 1):
-        table[(i, 0)].set_width(0.2)
-        table[(i, 1)].set_width(0.8)
-    
-    # Add title
-    plt.title('Earnings to Watch This Week', fontsize=24, fontweight='bold', pad=30)
-    
-    # Add source attribution at the bottom
-    fig.text(
-        0.5, 0.02,
-        'Source: Prepared by Ki-Wealth based on FMP data',
-        ha='center',
-        fontsize=14,
-        fontfamily='Segoe UI',
-        color='black',
-        style='italic'
-    )
-    
-    plt.tight_layout(rect=[0, 0.04, 1, 0.96])
-    
-    # Save the figure
-    filename = 'earnings_to_watch_this_week.png'
-    plt.savefig(filename, dpi=300, bbox_inches='tight', facecolor='white')
+        # Create table
+        table = ax.table(
+            cellText=display_data.values,
+            colLabels=display_data.columns,
+            cellLoc='left',
+            loc='center',
+            bbox=[0, 0, 1, 1]
+        )
+        
+        # Style table
+        table.auto_set_font_size(False)
+        table.scale(1, 2)
+        
+        # Style header row
+        for i in range(len(display_data.columns)):
+            cell = table[(0, i)]
+            cell.set_facecolor('#4304B7')
+            cell.set_text_props(weight='bold', color='white', fontsize=20, ha='center')
+            cell.set_height(0.08)
+        
+        # Style data rows
+        for i in range(1, len(display_data) + 1):
+            # Date column (left-aligned, centered vertically)
+            date_cell = table[(i, 0)]
+            date_cell.set_facecolor('#F0F0F0')
+            date_cell.set_text_props(color='black', fontsize=16, ha='left', va='center', weight='bold')
+            date_cell.set_edgecolor('#CCCCCC')
+            date_cell.set_height(0.15)
+            
+            # Symbols column (left-aligned, wrapped text)
+            symbol_cell = table[(i, 1)]
+            symbol_cell.set_facecolor('white')
+            symbol_cell.set_text_props(color='black', fontsize=16, ha='left', va='center')
+            symbol_cell.set_edgecolor('#CCCCCC')
+            symbol_cell.set_height(0.15)
+        
+        # Set column widths (Date: 20%, Symbols: 80%)
+        table.auto_set_column_width([0, 1])
+        for i in range(len(display_data) + 1):
+            table[(i, 0)].set_width(0.2)
+            table[(i, 1)].set_width(0.8)
+        
+        # Add title
+        ax.set_title('Earnings to Watch This Week', fontsize=24, fontweight='bold', pad=30)
+        
+        # Add source attribution at the bottom
+        fig.text(
+            0.5, 0.02,
+            'Source: Prepared by Ki-Wealth based on FMP data',
+            ha='center',
+            fontsize=14,
+            fontfamily='Segoe UI',
+            color='black',
+            style='italic'
+        )
+        
+        fig.tight_layout(rect=[0, 0.04, 1, 0.96])
+        
+        # Save the figure
+        filename = 'earnings_to_watch_this_week.png'
+        fig.savefig(filename, dpi=300, bbox_inches='tight', facecolor='white')
+    finally:
+        # Release the figure (and its raster buffer) even if rendering fails
+        plt.close(fig)
     print(f"\n✓ Table saved as {filename}")
     
     # Also print to console
@@ -434,24 +455,27 @@ def create_earnings_table(df: pd.DataFrame, filter_pattern: str = r'^[a-zA-Z]{1,
         print(f"\n{date_info}")
         print(f"  Symbols: {symbols}")
     print("\n" + "="*80 + "\n")
-    
-    plt.show()
 
 
-def main():
+def main(save_json: bool = True, use_cache: bool = True):
     """
     Main function to fetch and display earnings calendar data.
+    
+    Args:
+        save_json (bool): Also write the raw data to earnings_week_data.json
+        use_cache (bool): Reuse a recently cached API response
     """
     try:
         # Fetch earnings data for next 5 trading days
-        earnings_data = fetch_earnings_by_date_range()
+        earnings_data = fetch_earnings_by_date_range(use_cache=use_cache)
         
         # Display in JSON format
         display_json(earnings_data)
         
-        # Optionally save to file
         if earnings_data:
-            save_to_json_file(earnings_data)
+            # Optionally save to file
+            if save_json:
+                save_to_json_file(earnings_data)
             
             # Display summary statistics
             print(f"\nSummary:")
@@ -465,12 +489,13 @@ def main():
                     sorted_dates = sorted(dates)
                     print(f"  Date range: {sorted_dates[0]} to {sorted_dates[-1]}")
             
-            # Read JSON file and transform to DataFrame
+            # Transform the fetched data to DataFrame (no JSON file round-trip)
             print("\n" + "="*80)
-            print("PROCESSING DATA FROM JSON FILE")
+            print("PROCESSING EARNINGS DATA")
             print("="*80)
             
-            df = read_json_to_dataframe("earnings_week_data.json")
+            df = dict_to_dataframe(earnings_data)
+            print(f"✓ Successfully loaded {len(df)} records")
             
             if not df.empty:
                 # Display all data by date (max 10 symbols per date)
@@ -478,7 +503,7 @@ def main():
                 
                 # Filter and display symbols with 1-4 letters only
                 # Pattern: ^[a-zA-Z]{1,4}$ matches symbols with exactly 1 to 4 letters
-                filter_pattern = r'^[a-zA-Z]{1,4}$'
+                filter_pattern = DEFAULT_SYMBOL_PATTERN
                 filter_and_display_by_date(df, filter_pattern=filter_pattern, max_symbols=10)
                 
                 # Create professional table
@@ -491,4 +516,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    # Pass --no-cache to force a fresh API response
+    main(use_cache='--no-cache' not in sys.argv)
@@ -1,18 +1,22 @@
 import os
-import requests
-import json
+import sys
 import pandas as pd
+from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
 from dotenv import load_dotenv
+from common import get_cached, is_record_list, json_loads
 
 load_dotenv()
 
 
-def get_stock_data(type_key):
-    """Generic fetcher for gainers or losers."""
+def get_stock_data(type_key, use_cache=True):
+    """Generic fetcher for gainers or losers, served from the on-disk cache when fresh."""
     url = os.getenv(f'TOP_{type_key.upper()}_URL')
     api_key = os.getenv('FMP_API_KEY')
 
@@ -20,13 +24,18 @@ def get_stock_data(type_key):
         raise ValueError(f"Environment variables for {type_key} or API Key missing")
 
     try:
-        response = requests.get(f"{url}?apikey={api_key}", timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        # Shared session: pooled connections, gzip and retries on transient failures
+        content = get_cached(f"{url}?apikey={api_key}", use_cache=use_cache, validate=is_record_list, timeout=15)
 
-        # Save raw data
-        with open(f'top_{type_key}_raw.json', 'w') as f:
-            json.dump(data, f, indent=2)
+        # Save raw data as received rather than re-encoding the parsed payload
+        with open(f'top_{type_key}_raw.json', 'wb') as f:
+            f.write(content)
+
+        data = json_loads(content)
+        if not isinstance(data, list):
+            # FMP reports errors such as an invalid key as a JSON object, not a list of records
+            print(f"Error fetching {type_key}: unexpected payload {data}")
+            return []
 
         return data
     except Exception as e:
@@ -34,34 +43,45 @@ def get_stock_data(type_key):
         return []
 
 
+def fetch_all(type_keys, use_cache=True):
+    """Fetches several endpoints concurrently, returning {type_key: data}."""
+    with ThreadPoolExecutor(max_workers=len(type_keys)) as executor:
+        futures = {k: executor.submit(get_stock_data, k, use_cache) for k in type_keys}
+        return {k: future.result() for k, future in futures.items()}
+
+
 def process_data(data, type_key):
-    """Filters and formats data efficiently using Pandas."""
+    """Filters raw records, then formats the top 10 efficiently using Pandas."""
     if not data:
         return pd.DataFrame()
 
-    df = pd.DataFrame(data)
-    filter_pattern = r'^[a-zA-Z]{1,4}$'
-
-    mask = (
-            (df['exchange'].isin(['NASDAQ', 'NYSE'])) &
-            (df['symbol'].str.match(filter_pattern)) &
-            (df['price'] >= 50.00)
-    )
+    columns = ['symbol', 'name', 'price', 'changesPercentage', 'exchange']
 
+    # Gainers need a move of at least +10%, losers at most -10%
     if type_key == 'gainers':
-        mask &= (df['changesPercentage'] >= 10.00)
-        sort_asc = False
+        direction, sort_asc = 1, False
     else:
-        mask &= (df['changesPercentage'] <= -10.00)
-        sort_asc = True
-
-    df = df[mask].sort_values('changesPercentage', ascending=sort_asc).head(10).copy()
+        direction, sort_asc = -1, True
+
+    # Filter before building the DataFrame so only matching records are allocated
+    kept = [
+        r for r in data
+        if r.get('exchange') in ('NASDAQ', 'NYSE')
+        and (r.get('price') or 0) >= 50.00
+        and direction * (r.get('changesPercentage') or 0) >= 10.00
+        and 1 <= len(r.get('symbol') or '') <= 4
+        and r['symbol'].isalpha()
+        and r['symbol'].isascii()
+    ]
+
+    df = pd.DataFrame(kept, columns=columns)
+    df = df.sort_values('changesPercentage', ascending=sort_asc).head(10).copy()
 
     # Vectorized formatting
     df['changesPercentage'] = df['changesPercentage'].map("{:.1f}%".format)
     df['price'] = df['price'].map("${:.2f}".format)
 
-    return df[['symbol', 'name', 'price', 'changesPercentage', 'exchange']]
+    return df[columns]
 
 
 def create_split_slide(gainers_df, losers_df):
@@ -77,6 +97,19 @@ def create_split_slide(gainers_df, losers_df):
     GAINER_COLOR = RGBColor(67, 4, 183)  # #4304B7
     LOSER_COLOR = RGBColor(99, 46, 98)  # #632E62
 
+    # Run properties built once and copied into every cell, instead of
+    # setting size/bold/color through the font API cell by cell
+    header_rPr = parse_xml(
+        f'<a:rPr {nsdecls("a")} sz="1200" b="1">'
+        '<a:solidFill><a:srgbClr val="FFFFFF"/></a:solidFill></a:rPr>'
+    )
+    body_rPr = parse_xml(f'<a:rPr {nsdecls("a")} sz="1000"/>')
+
+    def set_cell_text(cell, text, rPr):
+        run = cell.text_frame.paragraphs[0].add_run()
+        run.text = text
+        run._r.insert(0, deepcopy(rPr))
+
     def add_table_to_side(df, title_text, left_pos, brand_color):
         # Section Title
         txBox = slide.shapes.add_textbox(left_pos, Inches(0.4), Inches(6.2), Inches(0.6))
@@ -104,23 +137,17 @@ def create_split_slide(gainers_df, losers_df):
         headers = ['Ticker', 'Company Name', 'Price', 'Chg%', 'Exchange']
         for i, h in enumerate(headers):
             cell = table.cell(0, i)
-            cell.text = h
+            set_cell_text(cell, h, header_rPr)
             cell.fill.solid()
             cell.fill.fore_color.rgb = brand_color
-
-            para = cell.text_frame.paragraphs[0]
-            para.font.color.rgb = RGBColor(255, 255, 255)
-            para.font.size = Pt(12)
-            para.font.bold = True
-            para.alignment = PP_ALIGN.CENTER
+            cell.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
 
         # Format Rows
-        for r_idx, (_, row) in enumerate(df.iterrows(), 1):
+        for r_idx, row in enumerate(df.itertuples(index=False, name=None), 1):
             for c_idx, val in enumerate(row):
                 cell = table.cell(r_idx, c_idx)
-                cell.text = str(val)
+                set_cell_text(cell, str(val), body_rPr)
                 para = cell.text_frame.paragraphs[0]
-                para.font.size = Pt(10)
 
                 # Zebra striping
                 if r_idx % 2 == 0:
@@ -153,10 +180,11 @@ def create_split_slide(gainers_df, losers_df):
     prs.save('top_gainers_and_losers_for_the_day.pptx')
 
 
-def main():
+def main(use_cache=True):
     print("--- Starting Professional Report Generation ---")
-    g_raw = get_stock_data('gainers')
-    l_raw = get_stock_data('losers')
+    # Fetch gainers and losers concurrently
+    raw = fetch_all(('gainers', 'losers'), use_cache)
+    g_raw, l_raw = raw['gainers'], raw['losers']
 
     g_df = process_data(g_raw, 'gainers')
     l_df = process_data(l_raw, 'losers')
@@ -170,4 +198,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Pass --no-cache to force fresh API responses
+    main(use_cache='--no-cache' not in sys.argv)
\ No newline at end of file
@@ -1,60 +1,60 @@
 from dotenv import load_dotenv
-import os
-import requests
-from datetime import datetime, timedelta
+import sys
+from functools import lru_cache
+import numpy as np
 import pandas as pd
+from common import (
+    cumulative_by, fetch_daily, get_cached, get_config, get_trading_days,
+    interactive, is_record_list, json_loads, require_config, use_batch_backend
+)
+use_batch_backend()
 import matplotlib.pyplot as plt
 from matplotlib.patches import Patch
 
 # Load environment variables from.env file
 load_dotenv()
 
-# Get API key and endpoint
-API_KEY = os.getenv('FMP_API_KEY')
-INDUSTRY_PERFORMANCE_URL = os.getenv('INDUSTRY_PERFORMANCE_URL')
+# The industries list changes at most daily, so reuse the cached copy for a day
+INDUSTRIES_CACHE_TTL = 24 * 3600
 
-# Define industries dictionary:
-AVAILABLE_INDUSTRIES_URL = os.getenv('AVAILABLE_INDUSTRIES')
 
-if not AVAILABLE_INDUSTRIES_URL:
-    print('No industries URL available in environment variables.')
-    exit()
-
-# 1. Load the target industries list
-try:
-    print("Loading available industries...")
-    industries_data = requests.get(AVAILABLE_INDUSTRIES_URL).json()
-    # Create a set for O(1) lookup speed
-    target_industries = {industry['industry'] for industry in industries_data}
-    print(f"✓ Loaded {len(target_industries)} target industries.")
-except Exception as e:
-    print(f"Error loading industries: {e}")
-    exit()
-
-
-def get_trading_days(num_days=5):
+@lru_cache(maxsize=1)
+def load_target_industries(use_cache=True):
     """
-    Generate a list of the past N trading days (excluding weekends).
-    Returns dates in YYYY-MM-DD format.
+    Loads the target industries list, served from the on-disk cache when fresh.
+    Loaded on first use and kept for the rest of the process.
+    Returns a frozenset for O(1) lookup speed.
     """
-    trading_days = []
-    current_date = datetime.now()
-    days_checked = 0
-    
-    while len(trading_days) < num_days and days_checked < num_days * 2:
-        # Check if it's a weekday (Monday=0, Sunday=6)
-        if current_date.weekday() < 5:  # Monday to Friday
-            trading_days.append(current_date.strftime('%Y-%m-%d'))
-        current_date -= timedelta(days=1)
-        days_checked += 1
-    
-    return trading_days
+    url = get_config().available_industries_url
+    if not url:
+        raise ValueError('No industries URL available in environment variables.')
 
+    # Only a non-empty list is cached, so an FMP error reply is not replayed for a day
+    content = get_cached(url, use_cache=use_cache, ttl=INDUSTRIES_CACHE_TTL, validate=is_record_list, timeout=15)
+    industries_data = json_loads(content)
+    if not isinstance(industries_data, list):
+        raise ValueError(f"Unexpected industries payload: {industries_data}")
 
-def get_industry_performance():
+    return frozenset(industry['industry'] for industry in industries_data)
+
+
+def get_industry_performance(use_cache=True):
     """
     Fetches industry performance data for the past 5 trading days and calculates cumulative performance.
+    Pass use_cache=False to refetch the industries list instead of using the on-disk copy.
     """
+    # Fail before any request when a setting is missing
+    config = require_config('api_key', 'industry_performance_url', 'available_industries_url')
+
+    # Load the target industries list
+    try:
+        print("Loading available industries...")
+        target_industries = load_target_industries(use_cache)
+        print(f"✓ Loaded {len(target_industries)} target industries.")
+    except Exception as e:
+        print(f"Error loading industries: {e}")
+        return None
+
     print(f"\nFetching industry performance data for the past 5 trading days...")
     print("=" * 40)
 
@@ -63,49 +63,31 @@ def get_industry_performance():
     print(f"Trading days to fetch: {', '.join(trading_days)}")
     print("=" * 40)
 
-    all_data = []
-
-    # Fetch data for each trading day
-    for date in trading_days:
-        try:
-            # Construct URL with date and API key
-            url = f"{INDUSTRY_PERFORMANCE_URL}?date={date}&apikey={API_KEY}"
-            
-            print(f"Fetching data for {date}...", end=" ")
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data:
-                # Add date to each record for tracking
-                for record in data:
-                    record['fetch_date'] = date
-                all_data.extend(data)
-                print(f"✓ ({len(data)} records)")
-            else:
-                print("⚠ No data")
-                
-        except requests.exceptions.RequestException as e:
-            print(f"✗ Error: {e}")
-        except ValueError as e:
-            print(f"✗ JSON Error: {e}")
-
-    if not all_data:
+    # Fetch all trading days concurrently
+    full_df = fetch_daily(config.industry_performance_url, config.api_key, trading_days)
+
+    if full_df is None:
         print("\n⚠ No data fetched for any trading day.")
         return None
 
-    print(f"\n✓ Total records fetched: {len(all_data)}")
+    print(f"\n✓ Total records fetched: {len(full_df)}")
 
-    # Convert to DataFrame
-    full_df = pd.DataFrame(all_data)
-
-    # Check if required columns exist
-    if 'industry' not in full_df.columns:
-        print("Error: API response does not contain 'industry' column.")
+    # Validate the response columns once, before filtering and aggregating
+    missing_columns = {'industry', 'averageChange'}.difference(full_df.columns)
+    if missing_columns:
+        print(f"Error: API response is missing columns: {', '.join(sorted(missing_columns))}")
+        print(f"Available columns: {full_df.columns.tolist()}")
         return None
 
-    # Filter for target industries
-    df = full_df[full_df['industry'].isin(target_industries)].copy()
+    # Encode industries once against the target list: rows outside it get
+    # code -1, and the encoded column is reused as the groupby key below
+    categories = pd.Index(sorted(target_industries))
+    codes = categories.get_indexer(full_df['industry'])
+    mask = codes >= 0
+
+    # Only read from here on, so no defensive copy; drop the unfiltered frame
+    df = full_df[mask].assign(industry=pd.Categorical.from_codes(codes[mask], categories))
+    del full_df
 
     if df.empty:
         print("⚠ No matching data found for the target industries.")
@@ -114,13 +96,8 @@ def get_industry_performance():
     print(f"✓ Filtered down to {len(df)} records matching your industry list.")
 
     # --- Calculate Cumulative 5-Day Performance ---
-    if 'averageChange' not in df.columns:
-        print(f"\nError: 'averageChange' column not found.")
-        print(f"Available columns: {df.columns.tolist()}")
-        return df
-
     # Group by industry and sum the performance across all 5 days
-    cumulative_performance = df.groupby('industry')['averageChange'].sum().sort_values(ascending=False)
+    cumulative_performance = cumulative_by(df, 'industry', 'averageChange')
 
     # Get top 5 and worst 5
     top_5 = cumulative_performance.head(5)
@@ -149,31 +126,25 @@ def get_industry_performance():
     return result_df
 
 
-def create_industry_performance_chart(df):
-    """
-    Creates a horizontal bar chart showing top 5 and worst 5 performing industries
-    sorted from maximum to minimum.
+def draw_industry_bars(ax, df):
     """
-    if df is None or df.empty:
-        print("No data available to create chart.")
-        return
+    Draws the top 5 and worst 5 performing industries as horizontal bars on an
+    existing axis, sorted from maximum to minimum.
 
-    # Sort by cumulative performance descending
-    df_sorted = df.sort_values('cumulative_performance', ascending=False)
-    
-    # Get top 5 and worst 5
-    top_5 = df_sorted.head(5)
-    worst_5 = df_sorted.tail(5)
-
-    # Combine and sort from maximum to minimum
-    combined = pd.concat([top_5, worst_5]).sort_values('cumulative_performance', ascending=False)
+    Args:
+        ax (matplotlib.axes.Axes): Axis to draw on
+        df (pd.DataFrame): DataFrame containing industry and cumulative_performance columns
+    """
+    # Get top 5 and worst 5 without sorting the whole frame
+    top_5 = df.nlargest(5, 'cumulative_performance')
+    worst_5 = df.nsmallest(5, 'cumulative_performance')
 
-    # Create figure
-    fig, ax = plt.subplots(figsize=(18, 14))
+    # Combine from maximum to minimum (nsmallest is ascending, so reverse it)
+    combined = pd.concat([top_5, worst_5.iloc[::-1]])
 
-    # Colors: Top 5 (Blue), Worst 5 (Purple)
-    colors = ['#5A06F5' if perf in top_5['cumulative_performance'].values else '#632E62' 
-              for perf in combined['cumulative_performance']]
+    # Colors: Top 5 (Blue), Worst 5 (Purple); the top 5 rows come first in combined
+    is_top = np.arange(len(combined)) < len(top_5)
+    colors = np.where(is_top, '#5A06F5', '#632E62')
 
     # Create horizontal bar chart
     bars = ax.barh(range(len(combined)), combined['cumulative_performance'].values, 
@@ -186,13 +157,9 @@ def create_industry_performance_chart(df):
     ax.set_title('Industry Performance: Top 5 vs Worst 5 (5-Day Cumulative)',
                  fontsize=16, fontweight='bold', pad=25)
 
-    # Add value labels
-    for i, (bar, value) in enumerate(zip(bars, combined['cumulative_performance'].values)):
-        offset = 0.3 if value > 0 else -0.3
-        ha_align = 'left' if value > 0 else 'right'
-        ax.text(value + offset, i, f'{value:+.2f}%',
-                va='center', ha=ha_align,
-                fontsize=12, fontweight='bold')
+    # Add value labels; bar_label places them past the bar end on either side of zero
+    labels = [f'{value:+.2f}%' for value in combined['cumulative_performance'].values]
+    ax.bar_label(bars, labels=labels, padding=3, fontsize=12, fontweight='bold')
 
     # Aesthetics
     ax.axvline(x=0, color='black', linestyle='-', linewidth=0.8)
@@ -205,8 +172,22 @@ def create_industry_performance_chart(df):
         Patch(facecolor='#5A06F5', edgecolor='black', label='Top 5 Performers'),
         Patch(facecolor='#632E62', edgecolor='black', label='Worst 5 Performers')
     ]
-    legend = ax.legend(handles=legend_elements, loc='upper right',
-                       fontsize=11, frameon=True, fancybox=True, shadow=True)
+    ax.legend(handles=legend_elements, loc='upper right',
+              fontsize=11, frameon=True, fancybox=True, shadow=True)
+
+
+def create_industry_performance_chart(df):
+    """
+    Creates a horizontal bar chart showing top 5 and worst 5 performing industries
+    sorted from maximum to minimum.
+    """
+    if df is None or df.empty:
+        print("No data available to create chart.")
+        return
+
+    # Create figure
+    fig, ax = plt.subplots(figsize=(18, 14))
+    draw_industry_bars(ax, df)
 
     # Add source text at the bottom
     fig.text(0.5, 0.02, 'Source: Ki-Wealth | 5-Day Cumulative Performance', 
@@ -217,12 +198,17 @@ def create_industry_performance_chart(df):
 
     # Save and show
     output_path = 'performance_by_industry_chart_5day.png'
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', pad_inches=0.3)
+    plt.savefig(output_path, dpi=150, bbox_inches='tight', pad_inches=0.3)
     print(f"\n✓ Chart saved as '{output_path}'")
-    plt.show()
+    if interactive():
+        plt.show()
+    
+    # Release the figure so repeated runs in one process do not accumulate them
+    plt.close(fig)
 
 
 if __name__ == "__main__":
-    industry_df = get_industry_performance()
+    # Pass --no-cache to force a fresh industries list
+    industry_df = get_industry_performance(use_cache='--no-cache' not in sys.argv)
     if industry_df is not None:
         create_industry_performance_chart(industry_df)
\ No newline at end of file
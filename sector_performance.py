@@ -1,17 +1,16 @@
 """Fetches sector performance data for the past 5 trading days and creates a cumulative performance bar chart."""
 from dotenv import load_dotenv
-import os
-import requests
-from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+from common import cumulative_by, fetch_daily, get_trading_days, interactive, require_config, use_batch_backend
+use_batch_backend()
 import matplotlib.pyplot as plt
 
 # Load environment variables
 load_dotenv()
 
-# Get API key and endpoint
-API_KEY = os.getenv('FMP_API_KEY')
-SECTOR_PERFORMANCE_URL = os.getenv('SECTOR_PERFORMANCE_URL')
+# Brand font for the chart text, applied with plt.rc_context
+CHART_RC = {'font.family': 'Segoe UI', 'font.size': 12}
 
 # Define sectors dictionary
 sectors = {
@@ -29,32 +28,19 @@ sectors = {
 }
 
 
-def get_trading_days(num_days=5):
-    """
-    Generate a list of the past N trading days (excluding weekends).
-    Returns dates in YYYY-MM-DD format.
-    """
-    trading_days = []
-    current_date = datetime.now()
-    days_checked = 0
-    
-    while len(trading_days) < num_days and days_checked < num_days * 2:
-        # Check if it's a weekday (Monday=0, Sunday=6)
-        if current_date.weekday() < 5:  # Monday to Friday
-            trading_days.append(current_date.strftime('%Y-%m-%d'))
-        current_date -= timedelta(days=1)
-        days_checked += 1
-    
-    return trading_days
-
-
-def get_sector_performance():
+def get_sector_performance(create_chart=True):
     """
     Fetches sector performance data for the past 5 trading days and calculates cumulative performance.
     
+    Args:
+        create_chart (bool): Also save the sector bar chart
+    
     Returns:
         pd.DataFrame: DataFrame containing cumulative sector performance metrics
     """
+    # Fail before any request when a setting is missing
+    config = require_config('api_key', 'sector_performance_url')
+    
     print("\nFetching sector performance data for the past 5 trading days...")
     print("=" * 80)
     
@@ -63,42 +49,13 @@ def get_sector_performance():
     print(f"Trading days to fetch: {', '.join(trading_days)}")
     print("=" * 80)
     
-    all_sector_data = []
-    
-    # Fetch data for each trading day
-    for date in trading_days:
-        try:
-            # Construct URL with date and API key
-            url = f"{SECTOR_PERFORMANCE_URL}?date={date}&apikey={API_KEY}"
-            
-            print(f"Fetching data for {date}...", end=" ")
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            # Parse the response data into JSON object
-            data = response.json()
-            
-            if data:
-                # Add date to each record for tracking
-                for record in data:
-                    record['fetch_date'] = date
-                all_sector_data.extend(data)
-                print(f"✓ ({len(data)} records)")
-            else:
-                print("⚠ No data")
-                
-        except requests.exceptions.RequestException as e:
-            print(f"✗ Error: {e}")
-        except ValueError as e:
-            print(f"✗ JSON Error: {e}")
+    # Fetch all trading days concurrently
+    df = fetch_daily(config.sector_performance_url, config.api_key, trading_days)
     
-    # Convert to DataFrame
-    if not all_sector_data:
+    if df is None:
         print("\n⚠ No sector performance data available.")
         return None
     
-    df = pd.DataFrame(all_sector_data)
-    
     print(f"\n✓ Total records fetched: {len(df)}")
     
     # Check if we have the necessary columns
@@ -121,7 +78,7 @@ def get_sector_performance():
     print(f"Using performance column: {perf_column}")
     
     # Calculate cumulative 5-day performance by sector
-    cumulative_performance = df.groupby('sector')[perf_column].sum().sort_values(ascending=False)
+    cumulative_performance = cumulative_by(df, 'sector', perf_column)
     
     # Print results
     print("\n" + "=" * 40)
@@ -138,31 +95,28 @@ def get_sector_performance():
     })
     
     # Create visual Sector Performance Bar Chart
-    create_sector_bar_chart(result_df)
+    if create_chart:
+        create_sector_bar_chart(result_df)
     
     return result_df
 
 
-def create_sector_bar_chart(df):
+def draw_sector_bars(ax, df):
     """
-    Creates a horizontal bar chart visualization of cumulative 5-day sector performance,
-    sorted from maximum to minimum.
+    Draws cumulative 5-day sector performance as horizontal bars on an existing
+    axis, sorted from maximum to minimum. Call inside plt.rc_context(CHART_RC)
+    so the text picks up the brand font.
     
     Args:
+        ax (matplotlib.axes.Axes): Axis to draw on
         df (pd.DataFrame): DataFrame containing sector and cumulative_performance columns
     """
-    if df is None or df.empty:
-        print("No data available to create chart.")
-        return
-    
     # Sort by cumulative performance descending (maximum to minimum)
     df_sorted = df.sort_values('cumulative_performance', ascending=False)
     
-    # Create figure and axis with better spacing
-    fig, ax = plt.subplots(figsize=(16, 12))
-    
-    # Create color list based on cumulative_performance values
-    colors = ['#632E62' if value < 0 else '#5A06F5' for value in df_sorted['cumulative_performance']]
+    # Pick colors by sign: index 0 (gain) or 1 (loss) into a two-color palette
+    palette = np.array(['#5A06F5', '#632E62'])
+    colors = palette[np.signbit(df_sorted['cumulative_performance'].to_numpy()).astype(int)]
     
     # Create horizontal bar chart (reversed y-axis for top-to-bottom display)
     bars = ax.barh(
@@ -176,38 +130,23 @@ def create_sector_bar_chart(df):
     
     # Set y-axis labels
     ax.set_yticks(range(len(df_sorted)))
-    ax.set_yticklabels(df_sorted['sector'].values, fontsize=12, fontfamily='Segoe UI')
+    ax.set_yticklabels(df_sorted['sector'].values)
     
-    # Add value labels on the bars
-    for i, value in enumerate(df_sorted['cumulative_performance'].values):
-        offset = 0.3 if value > 0 else -0.3
-        ha_align = 'left' if value > 0 else 'right'
-        ax.text(
-            value + offset,
-            i,
-            f'{value:+.2f}%',
-            va='center',
-            ha=ha_align,
-            fontsize=12,
-            fontfamily='Segoe UI',
-            color='black',
-            fontweight='bold'
-        )
+    # Add value labels on the bars; bar_label aligns them by the sign of each bar
+    labels = [f'{value:+.2f}%' for value in df_sorted['cumulative_performance'].values]
+    ax.bar_label(bars, labels=labels, padding=3, color='black', fontweight='bold')
     
     # Customize plot with 20px margin on top and bottom of title
     ax.set_title(
         'Sector Performance - Cumulative 5-Day Change (%)',
         fontsize=16,
         fontweight='bold',
-        fontfamily='Segoe UI',
         color='black',
         pad=20
     )
     
     ax.set_xlabel(
         'Cumulative 5-Day Performance (%)',
-        fontsize=12,
-        fontfamily='Segoe UI',
         color='black',
         fontweight='bold',
         labelpad=10
@@ -215,18 +154,13 @@ def create_sector_bar_chart(df):
     
     ax.set_ylabel(
         'Sector',
-        fontsize=12,
-        fontfamily='Segoe UI',
         color='black',
         fontweight='bold',
         labelpad=10
     )
     
     # Customize tick labels
-    ax.tick_params(axis='both', labelsize=12)
-    for label in ax.get_xticklabels() + ax.get_yticklabels():
-        label.set_fontfamily('Segoe UI')
-        label.set_color('black')
+    ax.tick_params(axis='both', labelsize=12, labelcolor='black')
     
     # Add grid for better readability
     ax.grid(axis='x', alpha=0.3, linestyle='--', linewidth=0.7, zorder=0)
@@ -237,26 +171,49 @@ def create_sector_bar_chart(df):
     
     # Add margins
     ax.margins(x=0.15, y=0.02)
+
+
+def create_sector_bar_chart(df):
+    """
+    Creates a horizontal bar chart visualization of cumulative 5-day sector performance,
+    sorted from maximum to minimum.
     
-    # Add source attribution below the x-axis
-    fig.text(
-        0.5, 0.02,
-        'Source: prepared by Ki-Wealth | 5-Day Cumulative Performance',
-        ha='center',
-        fontsize=10,
-        fontfamily='Segoe UI',
-        color='black',
-        style='italic'
-    )
-    
-    # Adjust layout with better spacing
-    plt.tight_layout(rect=[0.02, 0.04, 0.98, 0.97])
+    Args:
+        df (pd.DataFrame): DataFrame containing sector and cumulative_performance columns
+    """
+    if df is None or df.empty:
+        print("No data available to create chart.")
+        return
     
-    # Save and show the plot
-    output_path = 'sector_performance_bar_chart_5day.png'
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', pad_inches=0.3)
-    print(f"\n✓ Bar chart saved as '{output_path}'")
-    plt.show()
+    # Set the brand font once for every text artist in the chart; the
+    # previous rcParams are restored when the block exits
+    with plt.rc_context(CHART_RC):
+        # Create figure and axis with better spacing
+        fig, ax = plt.subplots(figsize=(16, 12))
+        draw_sector_bars(ax, df)
+        
+        # Add source attribution below the x-axis
+        fig.text(
+            0.5, 0.02,
+            'Source: prepared by Ki-Wealth | 5-Day Cumulative Performance',
+            ha='center',
+            fontsize=10,
+            color='black',
+            style='italic'
+        )
+        
+        # Adjust layout with better spacing
+        plt.tight_layout(rect=[0.02, 0.04, 0.98, 0.97])
+        
+        # Save and show the plot
+        output_path = 'sector_performance_bar_chart_5day.png'
+        plt.savefig(output_path, dpi=150, bbox_inches='tight', pad_inches=0.3)
+        print(f"\n✓ Bar chart saved as '{output_path}'")
+        if interactive():
+            plt.show()
+    
+    # Release the figure so repeated runs in one process do not accumulate them
+    plt.close(fig)
 
 
 if __name__ == "__main__":